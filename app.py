@@ -1,14 +1,27 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
 import spacy
+import uvicorn
+from spacy.matcher import PhraseMatcher
+from spacy.tokens import Doc
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 import logging
-from typing import Dict
-import pandas as pd
+import mmap
+from typing import AbstractSet, Dict, List, Mapping, Optional, Tuple
+import csv
 import os
+import pickle
+import re
+import sys
+import tempfile
+import time
 
-app = Flask(__name__)
-CORS(app)
+app = FastAPI(default_response_class=ORJSONResponse)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
 # Configure logging
 logging.basicConfig(
@@ -17,16 +30,159 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Load spaCy model for NLP
+# Load spaCy model for NLP. Queries are matched against a closed vocabulary,
+# so only the tokenizer is needed and every trained component is left out.
 try:
-    nlp = spacy.load("en_core_web_sm")
+    nlp = spacy.load(
+        "en_core_web_sm",
+        exclude=["tok2vec", "tagger", "parser", "senter", "attribute_ruler", "lemmatizer", "ner"]
+    )
+    # Longest text batch_parse will tokenize, well above any accepted /chat query
+    nlp.max_length = 2000
     logger.info("Successfully loaded spaCy model")
 except Exception as e:
     logger.error(f"Error loading spaCy model: {str(e)}")
     raise
 
+# Longest accepted /chat message, checked before any NLP work
+MAX_MESSAGE_LENGTH = 512
+
+FALLBACK_REPLY = "Sorry, I couldn't understand the location or information type in your query. Please ask about a city or state and specify the type of information you're interested in, such as weather, culture, or tourist attractions."
+
+# Keywords mapped to the info type they request
+INFO_TYPE_KEYWORDS = {
+    "weather": "weather",
+    "travel restrictions": "travel_restrictions",
+    "vaccination": "vaccination_requirements",
+    "culture": "culture",
+    "transportation": "transportation",
+    "tourist attractions": "tourist_attractions",
+}
+
+# cities.csv fields stored as-is, each in its own column keyed by city name
+CITY_FIELDS = (
+    "state",
+    "travel_restrictions",
+    "vaccination_requirements",
+    "culture",
+    "transportation",
+)
+
+# Raw per-season weather fields of cities.csv, also stored as columns
+WEATHER_FIELDS = ("weather_summer", "weather_monsoon", "weather_winter")
+
+# Every city column: the fields above plus the preformatted weather reply
+CITY_COLUMNS = (*CITY_FIELDS, *WEATHER_FIELDS, "weather")
+
+# Bumped whenever the pickled layout changes so stale snapshots are ignored.
+# Only raw CSV fields are pickled; formatted replies are rebuilt on load.
+SNAPSHOT_VERSION = 6
+
+@dataclass(slots=True)
+class StateRecord:
+    """Information about a state, as loaded from states.csv."""
+    capital: str
+    major_cities: List[str]
+    tourist_attractions: List[str]
+    culture: str
+    best_time_to_visit: str
+    summary: str = ""
+
+def format_weather(row: Dict[str, str]) -> str:
+    """Format the weather reply for a cities.csv row."""
+    return (
+        f"Weather in {row['city'].title()}:\n"
+        f"Summer: {row['weather_summer']}\n"
+        f"Monsoon: {row['weather_monsoon']}\n"
+        f"Winter: {row['weather_winter']}"
+    )
+
+def format_state_summary(state: str, record: StateRecord) -> str:
+    """Format the general information reply for a state."""
+    return (
+        f"Here is some general information about {state.title()}: "
+        f"Capital: {record.capital}, "
+        f"Major Cities: {', '.join(record.major_cities)}, "
+        f"Tourist Attractions: {', '.join(record.tourist_attractions)}, "
+        f"Culture: {record.culture}, "
+        f"Best Time to Visit: {record.best_time_to_visit}"
+    )
+
+class MmapCityTable:
+    """
+    Index of a memory-mapped cities.csv that decodes rows only when they are read.
+
+    Only the byte offsets of each row are kept in memory, and recently read rows
+    are cached. Every row must fit on a single line, which holds for cities.csv
+    since multi-line values are written with literal \\n sequences.
+    """
+
+    def __init__(self, csv_path: str, cache_size: int = 256):
+        with open(csv_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+
+        header_end = self._line_end(0)
+        self._check_closed_quotes(csv_path, 0, header_end)
+        self._header = self._parse(0, header_end)
+        city_index = self._header.index('city')
+        start = header_end + 1
+        while start < len(self._mm):
+            end = self._line_end(start)
+            self._check_closed_quotes(csv_path, start, end)
+            fields = self._parse(start, end)
+            if fields:
+                if len(fields) != len(self._header):
+                    raise ValueError(
+                        f"{csv_path}: row at byte {start} has {len(fields)} fields instead of "
+                        f"{len(self._header)}; rows must not contain line breaks"
+                    )
+                self.offsets[sys.intern(fields[city_index].casefold())] = (start, end)
+            start = end + 1
+        self.row = lru_cache(maxsize=cache_size)(self._read_row)
+
+    def _check_closed_quotes(self, csv_path: str, start: int, end: int) -> None:
+        # Escaped quotes come in pairs, so an odd count leaves a quoted value open
+        # across the line break, even when the line parses into the right field count
+        if self._mm[start:end].count(b'"') % 2:
+            raise ValueError(
+                f"{csv_path}: row at byte {start} has a quoted value spanning several lines; "
+                f"rows must not contain line breaks"
+            )
+
+    def _line_end(self, start: int) -> int:
+        end = self._mm.find(b'\n', start)
+        return len(self._mm) if end == -1 else end
+
+    def _parse(self, start: int, end: int) -> List[str]:
+        line = self._mm[start:end].decode('ISO-8859-1').rstrip('\r')
+        return next(csv.reader([line]), [])
+
+    def _read_row(self, city: str) -> Dict[str, str]:
+        return dict(zip(self._header, self._parse(*self.offsets[city])))
+
+class MmapCityColumn(Mapping):
+    """One field of an MmapCityTable, read like the in-memory city columns."""
+
+    def __init__(self, table: MmapCityTable, field: str):
+        self._table = table
+        self._field = field
+
+    def __getitem__(self, city: str) -> str:
+        row = self._table.row(city)
+        if self._field == 'weather':
+            return format_weather(row)
+        return row[self._field]
+
+    def __iter__(self):
+        return iter(self._table.offsets)
+
+    def __len__(self) -> int:
+        return len(self._table.offsets)
+
 class TravelAdvisor:
-    def __init__(self, cities_csv_path: str = 'cities.csv', states_csv_path: str = 'states.csv'):
+    def __init__(self, cities_csv_path: str = 'cities.csv', states_csv_path: str = 'states.csv',
+                 snapshot_path: str = 'advisor.pkl', lazy_cities: bool = False):
         """
         Initialize TravelAdvisor with data from CSV files.
         
@@ -34,122 +190,247 @@ class TravelAdvisor:
         cities.csv: city,state,travel_restrictions,vaccination_requirements,culture,
                    transportation,weather_summer,weather_monsoon,weather_winter
         states.csv: state,capital,major_cities,tourist_attractions,culture,best_time_to_visit
+
+        The parsed data is pickled to snapshot_path and reused on later starts
+        for as long as both CSV files keep the path, modification time and size
+        recorded in the snapshot.
+
+        With lazy_cities, cities.csv is memory-mapped and city rows are only
+        decoded when asked for, instead of being loaded up front. The snapshot
+        is not used in that mode.
         """
-        self.cities_info: Dict[str, Dict] = {}
-        self.states_info: Dict[str, Dict] = {}
+        self.cities: AbstractSet[str] = frozenset()
+        self.city_fields: Dict[str, Mapping[str, str]] = {
+            field: {} for field in CITY_COLUMNS
+        }
+        self.states_info: Dict[str, StateRecord] = {}
         
-        self._load_cities_data(cities_csv_path)
-        self._load_states_data(states_csv_path)
+        if lazy_cities:
+            self._map_cities_data(cities_csv_path)
+            self._load_states_data(states_csv_path)
+        else:
+            sources = self._snapshot_sources([cities_csv_path, states_csv_path])
+            if not self._load_snapshot(snapshot_path, sources):
+                self._load_cities_data(cities_csv_path)
+                self._load_states_data(states_csv_path)
+                self._save_snapshot(snapshot_path, sources)
+        self._build_matchers()
+
+    @staticmethod
+    def _snapshot_sources(csv_paths: List[str]) -> List[Tuple[str, int, int]]:
+        """Identify the CSV files a snapshot is built from by path, mtime and size."""
+        sources = []
+        for path in csv_paths:
+            stat = os.stat(path)
+            sources.append((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+        return sources
+
+    def _load_snapshot(self, snapshot_path: str, sources: List[Tuple[str, int, int]]) -> bool:
+        """Load cities and states data from a pickled snapshot built from the same CSV files."""
+        try:
+            if not os.path.exists(snapshot_path):
+                return False
+            with open(snapshot_path, 'rb') as f:
+                version, snapshot_sources, cities, city_fields, states_info = pickle.load(f)
+            if version != SNAPSHOT_VERSION or snapshot_sources != sources:
+                return False
+            # Unpickled strings are not interned, so intern the keys again
+            self.cities = frozenset(sys.intern(city) for city in cities)
+            self.city_fields = {
+                field: {sys.intern(city): value for city, value in column.items()}
+                for field, column in city_fields.items()
+            }
+            # Rebuild the formatted replies so edits to the formatting code take effect
+            self.city_fields['weather'] = {
+                city: format_weather({
+                    'city': city, **{field: self.city_fields[field][city] for field in WEATHER_FIELDS}
+                })
+                for city in self.cities
+            }
+            self.states_info = {}
+            for state, fields in states_info.items():
+                state_data = StateRecord(*fields)
+                state_data.summary = format_state_summary(state, state_data)
+                self.states_info[sys.intern(state)] = state_data
+            logger.info(f"Loaded data for {len(self.cities)} cities and "
+                        f"{len(self.states_info)} states from {snapshot_path}")
+            return True
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable snapshot {snapshot_path}: {str(e)}")
+            return False
+
+    def _save_snapshot(self, snapshot_path: str, sources: List[Tuple[str, int, int]]) -> None:
+        """Pickle the loaded cities and states data for the next start."""
+        tmp_path = None
+        try:
+            # Write to a temporary file and swap it in, so no reader sees a partial snapshot
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(snapshot_path)),
+                                            prefix=os.path.basename(snapshot_path) + '.',
+                                            suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                # Formatted replies are left out and rebuilt on load
+                city_fields = {
+                    field: column for field, column in self.city_fields.items() if field != 'weather'
+                }
+                # States are stored as plain tuples: a pickled StateRecord would name
+                # the module that wrote it, which is __main__ under `python app.py`
+                states_info = {
+                    state: (data.capital, data.major_cities, data.tourist_attractions,
+                            data.culture, data.best_time_to_visit)
+                    for state, data in self.states_info.items()
+                }
+                pickle.dump((SNAPSHOT_VERSION, sources, self.cities, city_fields,
+                             states_info), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, snapshot_path)
+        except Exception as e:
+            logger.warning(f"Could not write snapshot {snapshot_path}: {str(e)}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
     def _load_cities_data(self, csv_path: str) -> None:
         """Load cities data from CSV file."""
         try:
+            cities = set()
             # Specify encoding='ISO-8859-1' to handle special characters
-            df = pd.read_csv(csv_path, encoding='ISO-8859-1')
-            for _, row in df.iterrows():
-                city_data = {
-                    'state': row['state'],
-                    'travel_restrictions': row['travel_restrictions'],
-                    'vaccination_requirements': row['vaccination_requirements'],
-                    'culture': row['culture'],
-                    'transportation': row['transportation'],
-                    'weather': {
-                        'summer': row['weather_summer'],
-                        'monsoon': row['weather_monsoon'],
-                        'winter': row['weather_winter']
-                    }
-                }
-                self.cities_info[row['city'].lower()] = city_data
-            logger.info(f"Successfully loaded data for {len(self.cities_info)} cities")
+            with open(csv_path, encoding='ISO-8859-1', newline='') as f:
+                for row in csv.DictReader(f):
+                    city = sys.intern(row['city'].casefold())
+                    cities.add(city)
+                    for field in (*CITY_FIELDS, *WEATHER_FIELDS):
+                        self.city_fields[field][city] = row[field]
+                    # Weather replies never change after load, so format them once here
+                    self.city_fields['weather'][city] = format_weather(row)
+            # The known cities never change after load, so freeze them for lookups
+            self.cities = frozenset(cities)
+            logger.info(f"Successfully loaded data for {len(self.cities)} cities")
         except Exception as e:
             logger.error(f"Error loading cities data: {str(e)}")
             raise
 
+    def _map_cities_data(self, csv_path: str) -> None:
+        """Index cities data in a memory-mapped CSV file without loading it."""
+        try:
+            table = MmapCityTable(csv_path)
+            # The index's own keys serve as the city set, so no second copy is kept
+            self.cities = table.offsets.keys()
+            self.city_fields = {
+                field: MmapCityColumn(table, field) for field in CITY_COLUMNS
+            }
+            logger.info(f"Successfully indexed data for {len(self.cities)} cities")
+        except Exception as e:
+            logger.error(f"Error indexing cities data: {str(e)}")
+            raise
+
     def _load_states_data(self, csv_path: str) -> None:
         """Load states data from CSV file."""
         try:
             # Specify encoding='ISO-8859-1' to handle special characters
-            df = pd.read_csv(csv_path, encoding='ISO-8859-1')
-            for _, row in df.iterrows():
-                state_data = {
-                    'capital': row['capital'],
-                    'major_cities': row['major_cities'].split('|'),  # Assuming cities are pipe-separated
-                    'tourist_attractions': row['tourist_attractions'].split('|'),
-                    'culture': row['culture'],
-                    'best_time_to_visit': row['best_time_to_visit']
-                }
-                self.states_info[row['state'].lower()] = state_data
+            with open(csv_path, encoding='ISO-8859-1', newline='') as f:
+                for row in csv.DictReader(f):
+                    state_data = StateRecord(
+                        capital=row['capital'],
+                        major_cities=row['major_cities'].split('|'),  # Assuming cities are pipe-separated
+                        tourist_attractions=row['tourist_attractions'].split('|'),
+                        culture=row['culture'],
+                        best_time_to_visit=row['best_time_to_visit']
+                    )
+                    state_data.summary = format_state_summary(row['state'], state_data)
+                    self.states_info[sys.intern(row['state'].casefold())] = state_data
             logger.info(f"Successfully loaded data for {len(self.states_info)} states")
         except Exception as e:
             logger.error(f"Error loading states data: {str(e)}")
             raise
 
+    def _build_matchers(self) -> None:
+        """Build phrase matchers over the known places and info type keywords."""
+        # Each place gets its own match key so a match resolves straight to its name.
+        # Names and queries are both casefolded, so the exact token text is matched.
+        self.location_matcher = PhraseMatcher(nlp.vocab)
+        self._locations: Dict[int, Tuple[str, str]] = {}
+        for kind, names in (("city", self.cities), ("state", self.states_info)):
+            for name, pattern in zip(names, nlp.tokenizer.pipe(names)):
+                key = f"{kind}:{name}"
+                self.location_matcher.add(key, [pattern])
+                self._locations[nlp.vocab.strings[key]] = (kind, name)
+
+        # One alternation finds the first info type keyword in a single scan
+        self._info_re = re.compile("|".join(re.escape(keyword) for keyword in INFO_TYPE_KEYWORDS))
+
     def get_city_info(self, city: str, info_type: str) -> str:
-        """Get specific information about a city."""
-        city = city.lower()
-        if city in self.cities_info:
-            if info_type == 'weather':
-                weather_info = self.cities_info[city]['weather']
-                return f"""
-                Weather in {city.title()}:
-                Summer: {weather_info['summer']}
-                Monsoon: {weather_info['monsoon']}
-                Winter: {weather_info['winter']}
-                """
-            return self.cities_info[city].get(info_type, 
-                   "Specific information not available for this aspect of the city.")
+        """Get specific information about a city, given its casefolded name."""
+        if city in self.cities:
+            column = self.city_fields.get(info_type)
+            if column is not None:
+                return column[city]
+            return "Specific information not available for this aspect of the city."
         return f"Information about {city.title()} is not available."
 
-    def get_state_info(self, state: str) -> Dict:
-        """Get information about a state."""
-        state = state.lower()
-        return self.states_info.get(state, {})
+    def get_city_record(self, city: str) -> Dict:
+        """Gather the fields of a city, given its casefolded name, into one nested dict."""
+        record = {field: self.city_fields[field][city] for field in CITY_FIELDS}
+        record['weather'] = {
+            field.split('_', 1)[1]: self.city_fields[field][city] for field in WEATHER_FIELDS
+        }
+        return record
+
+    def get_state_info(self, state: str) -> Optional[StateRecord]:
+        """Get information about a state, given its casefolded name."""
+        return self.states_info.get(state)
+
+    def batch_parse(self, messages: List[str]) -> List[Doc]:
+        """Tokenize a batch of user queries in a single pass."""
+        # nlp.tokenizer skips the max_length check that nlp() does, so enforce it here
+        for message in messages:
+            if len(message) > nlp.max_length:
+                raise ValueError(f"Query of {len(message)} characters exceeds the "
+                                 f"{nlp.max_length} character limit")
+        return list(nlp.tokenizer.pipe(messages, batch_size=max(len(messages), 1)))
 
     def process_query(self, message: str) -> str:
         """Process user query and return relevant travel information."""
-        doc = nlp(message.lower())
-        
+        return self.answer_query(self.batch_parse([message.casefold()])[0])
+
+    def answer_query(self, doc: Doc) -> str:
+        """Build the reply for an already tokenized, casefolded user query."""
         city = None
         state = None
         info_type = None
-        
-        for ent in doc.ents:
-            if ent.label_ == "GPE":  # Geopolitical entity
-                if ent.text.lower() in self.cities_info:
-                    city = ent.text.lower()
-                elif ent.text.lower() in self.states_info:
-                    state = ent.text.lower()
-        
+
+        # Resolve the longest matched place name, preferring cities over states
+        city_len = state_len = 0
+        for match_id, start, end in self.location_matcher(doc):
+            kind, name = self._locations[match_id]
+            if kind == "city":
+                if end - start >= city_len:
+                    city, city_len = name, end - start
+            elif not city and end - start >= state_len:
+                state, state_len = name, end - start
+
+        # Nothing else in the query matters without a place to answer about
+        if not city and not state:
+            return FALLBACK_REPLY
+
         # Identify type of information requested
-        if "weather" in message:
-            info_type = "weather"
-        elif "travel restrictions" in message:
-            info_type = "travel_restrictions"
-        elif "vaccination" in message:
-            info_type = "vaccination_requirements"
-        elif "culture" in message:
-            info_type = "culture"
-        elif "transportation" in message:
-            info_type = "transportation"
-        elif "tourist attractions" in message:
-            info_type = "tourist_attractions"
-        
+        match = self._info_re.search(doc.text)
+        if match:
+            info_type = INFO_TYPE_KEYWORDS[match.group()]
+
         # Generate response based on identified city or state and info type
         if city:
             if info_type:
                 return self.get_city_info(city, info_type)
             else:
-                return f"Here is some general information about {city.title()}: {self.cities_info[city]}"
+                return f"Here is some general information about {city.title()}: {self.get_city_record(city)}"
         
         elif state:
             state_info = self.get_state_info(state)
-            if state_info:
+            if state_info is not None:
                 # Provide general information if no specific info type is requested
                 if not info_type:
-                    return f"Here is some general information about {state.title()}: Capital: {state_info['capital']}, Major Cities: {', '.join(state_info['major_cities'])}, Tourist Attractions: {', '.join(state_info['tourist_attractions'])}, Culture: {state_info['culture']}, Best Time to Visit: {state_info['best_time_to_visit']}"
-                return f"Here is some specific information about {state.title()}: {state_info.get(info_type, 'Information not available.')}"
+                    return state_info.summary
+                return f"Here is some specific information about {state.title()}: {getattr(state_info, info_type, 'Information not available.')}"
         
-        return "Sorry, I couldn't understand the location or information type in your query. Please ask about a city or state and specify the type of information you're interested in, such as weather, culture, or tourist attractions."
+        return FALLBACK_REPLY
 
 
 # Example CSV content for cities.csv
@@ -178,29 +459,61 @@ def create_example_csv_files():
 
 # Initialize the travel advisor
 create_example_csv_files()
-travel_advisor = TravelAdvisor()
+travel_advisor = TravelAdvisor(lazy_cities=os.environ.get('TRAVEL_ADVISOR_LAZY_CITIES') == '1')
+
+@lru_cache(maxsize=4096)
+def cached_query(message: str) -> str:
+    """Answer a normalized query, memoized since replies only depend on the loaded data."""
+    return travel_advisor.answer_query(travel_advisor.batch_parse([message])[0])
+
+# Formatted seconds of the last reply timestamp, as a (second, iso_prefix) pair
+_timestamp_cache = (0, "")
+
+def current_timestamp() -> str:
+    """Return the local time in ISO format, only formatting the seconds part when it changes."""
+    global _timestamp_cache
+    sec, nanos = divmod(time.time_ns(), 1_000_000_000)
+    cached_sec, prefix = _timestamp_cache
+    if sec != cached_sec:
+        prefix = datetime.fromtimestamp(sec).isoformat()
+        _timestamp_cache = (sec, prefix)
+    return f"{prefix}.{nanos // 1000:06d}"
 
-@app.route('/chat', methods=['POST'])
-def chat():
+class ChatIn(BaseModel):
+    message: str = ""
+
+@app.post('/chat')
+async def chat(body: ChatIn):
     try:
-        data = request.get_json()
-        user_message = data.get('message', '')
+        user_message = body.message
         
         if not user_message:
-            return jsonify({"error": "No message provided"}), 400
+            return ORJSONResponse({"error": "No message provided"}, status_code=400)
+
+        if len(user_message) > MAX_MESSAGE_LENGTH:
+            return ORJSONResponse({"error": "Message too long"}, status_code=413)
+
+        # Without any letters there is no place or keyword to match
+        if not any(c.isalpha() for c in user_message):
+            return {
+                "reply": FALLBACK_REPLY,
+                "timestamp": current_timestamp()
+            }
 
         logger.info(f"Received query: {user_message}")
-        response = travel_advisor.process_query(user_message)
+        # Answering is a tokenizer call plus dict lookups (or a cache hit), cheaper
+        # than handing the request to a worker thread, so it runs on the event loop
+        response = cached_query(user_message.strip().casefold())
         logger.info(f"Sending response for query")
         
-        return jsonify({
+        return {
             "reply": response,
-            "timestamp": datetime.now().isoformat()
-        })
+            "timestamp": current_timestamp()
+        }
 
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
-        return jsonify({"error": "Internal Server Error"}), 500
+        return ORJSONResponse({"error": "Internal Server Error"}, status_code=500)
 
 if __name__ == "__main__":
-    app.run(port=8075 ,debug=True)
+    uvicorn.run(app, port=8075)
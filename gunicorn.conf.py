@@ -0,0 +1,18 @@
+import gc
+import multiprocessing
+
+# Serve the FastAPI app with `gunicorn app:app`; this file is picked up automatically
+bind = ":8075"
+workers = multiprocessing.cpu_count()
+# Provided by the uvicorn-worker package; uvicorn.workers is deprecated
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Load the app (spaCy model and CSV data) once in the master before forking,
+# so workers share it copy-on-write instead of each loading their own copy
+preload_app = True
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers do not write to (and so copy) the shared pages
+    gc.freeze()